@@ -24,6 +24,7 @@ import logging
 
 from app.agents.mcp_tools import MCP_FUNCTIONS
 from app.agents.tool_definitions import get_tools_for_agent
+from services.client_service import get_project_openai_client
 
 from opentelemetry import trace
 from azure.monitor.opentelemetry import configure_azure_monitor
@@ -67,7 +68,7 @@ class AgentProcessor:
     def run_conversation_with_text(self, input_message: str = ""):
         """Synchronous generator that yields streamed text chunks."""
         start_time = time.time()
-        openai_client = self.project_client.get_openai_client()
+        openai_client = get_project_openai_client(self.project_client)
         thread_id = self.thread_id
 
         if thread_id:
@@ -125,7 +126,7 @@ class AgentProcessor:
         start_time = time.time()
 
         try:
-            openai_client = self.project_client.get_openai_client()
+            openai_client = get_project_openai_client(self.project_client)
 
             # Create or continue conversation thread
             if thread_id:
@@ -173,7 +174,8 @@ class AgentProcessor:
             return [self._extract_text(message)]
 
         except Exception as e:
-            logger.error(f"Conversation failed: {e}", exc_info=True)
+            logger.error(f"Conversation failed: {e}")
+            logger.debug("Conversation failure traceback", exc_info=True)
             return [f"Error processing message: {str(e)}"]
 
     async def run_conversation_with_text_stream(self, input_message: str = ""):
@@ -1,12 +1,11 @@
 import os
 import sys
 import requests
-from azure.cosmos import CosmosClient
-from azure.identity import DefaultAzureCredential
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
+from services.client_service import get_credential, get_cosmos_client
 
 # Cosmos DB configuration
 COSMOS_ENDPOINT = os.environ.get("COSMOS_ENDPOINT")
@@ -18,7 +17,7 @@ EMBEDDING_ENDPOINT = os.environ.get("embedding_endpoint")
 EMBEDDING_DEPLOYMENT = os.environ.get("embedding_deployment")
 EMBEDDING_API_VERSION = os.environ.get("embedding_api_version")
 
-credential = DefaultAzureCredential()
+credential = get_credential()
 
 # Validate required Cosmos env vars
 if not COSMOS_ENDPOINT:
@@ -29,15 +28,6 @@ if not CONTAINER_NAME:
     raise ValueError("CONTAINER_NAME environment variable is not set")
 
 
-def get_cosmos_client(endpoint: str | None):
-    if not endpoint:
-        raise ValueError("COSMOS_ENDPOINT must be provided in environment variables")
-
-    client = CosmosClient(endpoint, credential=credential)
-    _ = list(client.list_databases())
-    return client
-
-
 def get_request_embedding(text: str) -> list[float] | None:
     """Call embedding endpoint and return the embedding vector or None on failure."""
     if not EMBEDDING_ENDPOINT or not EMBEDDING_DEPLOYMENT or not EMBEDDING_API_VERSION:
@@ -60,6 +50,7 @@ def get_request_embedding(text: str) -> list[float] | None:
 
 # Initialize Cosmos client and container
 _cosmos_client = get_cosmos_client(COSMOS_ENDPOINT)
+_ = list(_cosmos_client.list_databases())
 _database = _cosmos_client.get_database_client(DATABASE_NAME)
 _container = _database.get_container_client(CONTAINER_NAME)
 
@@ -1,9 +1,8 @@
 import os
 import pandas as pd
-from openai import AzureOpenAI
-from azure.identity import DefaultAzureCredential, get_bearer_token_provider
 from dotenv import load_dotenv
 load_dotenv()
+from services.client_service import get_azure_openai_client
 
 from opentelemetry import trace
 from azure.monitor.opentelemetry import configure_azure_monitor
@@ -20,11 +19,7 @@ application_insights_connection_string = os.environ["APPLICATIONINSIGHTS_CONNECT
 # tracer = trace.get_tracer(__name__)
 
 #Azure OpenAI
-endpoint = os.getenv("gpt_endpoint")
 deployment = os.getenv("gpt_deployment")
-api_version = os.getenv("gpt_api_version")
-credential = DefaultAzureCredential()
-token_provider = get_bearer_token_provider(credential, "https://cognitiveservices.azure.com/.default")
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))  # Go up 2 levels from src/tools/ to root
@@ -131,12 +126,8 @@ def calculate_discount(CustomerID):
         Returns:
             float: Discount amount to be applied based on the business logic.
         """
-        # Initialize client
-        client = AzureOpenAI(
-            azure_endpoint=endpoint,
-            azure_ad_token_provider=token_provider,
-            api_version=api_version,
-        )
+        # Reuse the shared client (and its connection pool) across calls
+        client = get_azure_openai_client()
         # print(f"loyalty_info is:{loyalty_info}, invoice value: {InvoiceValue} and transaction_info is:{transaction_info}")
         prompt= "Bruno's total transaction price in this year"+ transaction_info + "and his data"+str(loyalty_info)
         # print(f"prompt:{prompt}")
@@ -5,7 +5,7 @@ import datetime
 import time
 import uuid
 from collections import deque
-from typing import Deque, Tuple, Optional, Dict
+from typing import Optional, Dict
 from concurrent.futures import ThreadPoolExecutor
 import orjson  # Faster JSON library
 from dotenv import load_dotenv
@@ -27,12 +27,12 @@ from fastapi.responses import HTMLResponse
 # Custom Utilities
 from utils.history_utils import (
     format_chat_history, redact_bad_prompts_in_history, clean_conversation_history,
-    parse_conversation_history
+    parse_conversation_history, FormattedHistory
 )
 from utils.response_utils import (
     extract_bot_reply, parse_agent_response, extract_product_names_from_response
 )
-from utils.log_utils import log_timing, log_cache_status
+from utils.log_utils import log_timing, log_timing_counts, log_cache_status
 from utils.env_utils import load_env_vars, validate_env_vars
 from utils.message_utils import (
     IMAGE_UPLOAD_MESSAGES, IMAGE_CREATE_MESSAGES, IMAGE_ANALYSIS_MESSAGES,
@@ -135,7 +135,8 @@ project_client = AIProjectClient(
 #     azure_openai_client=llm_client,
 #     deployment_name=validated_env_vars['gpt_deployment'],
 #     default_domain="cora",
-#     lazy_classification=True
+#     lazy_classification=True,
+#     embedding_deployment=os.environ.get("embedding_deployment"),
 # )
 
 @app.get("/")
@@ -165,7 +166,7 @@ async def websocket_endpoint(websocket: WebSocket):
     
     await websocket.accept()
 
-    chat_history: Deque[Tuple[str, str]] = deque(maxlen=5)
+    chat_history: FormattedHistory = FormattedHistory(maxlen=5)
 
     # Session-level state variables
     customer_loyalty_executed = False               # Flag to track if customer loyalty task has been executed
@@ -179,14 +180,14 @@ async def websocket_endpoint(websocket: WebSocket):
     raw_io_history = deque(maxlen=100)              # Use deque with maxlen for raw_io_history to prevent unbounded growth
 
     async def run_customer_loyalty_task(customer_id):
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         with tracer.start_as_current_span("Run Customer Loyalty Thread"):
             nonlocal session_discount_percentage, session_loyalty_response
             message = f"Calculate discount for the customer with id {customer_id}"
             customer_loyalty_id = validated_env_vars.get('customer_loyalty')
             if not customer_loyalty_id:
                 session_loyalty_response = {"answer": "Customer loyalty agent not configured.", "agent": "customer_loyalty"}
-                log_timing("Customer Loyalty Task", start_time, "Agent not configured")
+                log_timing("Customer Loyalty Task", start_ns, "Agent not configured")
                 return
                 
             processor = get_or_create_agent_processor(
@@ -206,11 +207,11 @@ async def websocket_endpoint(websocket: WebSocket):
                 session_discount_percentage = parsed_response["discount_percentage"]
             session_loyalty_response = parsed_response  # Store the full response for later
             # Do NOT send the response here!
-            log_timing("Customer Loyalty Task", start_time, f"Discount: {session_discount_percentage}")
+            log_timing("Customer Loyalty Task", start_ns, f"Discount: {session_discount_percentage}")
 
     try:
         while True:
-            message_start_time = time.time()
+            message_start_ns = time.perf_counter_ns()
             try:
                 data = await websocket.receive_text()
                 parsed = orjson.loads(data)  # Use orjson for faster parsing
@@ -230,7 +231,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 
                 # Append user message to raw_io_history
                 raw_io_history.append({"input": user_message, "cart": persistent_cart})
-                log_timing("Message Parsing", message_start_time, f"Message length: {len(user_message)} chars")
+                log_timing("Message Parsing", message_start_ns, f"Message length: {len(user_message)} chars")
             except WebSocketDisconnect:
                 logger.info("WebSocket connection terminated - client disconnected from endpoint")
                 break
@@ -290,7 +291,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
             # # --- Step 3: Enrich context and execute agent ---
             # try:
-            #     agent_execution_start_time = time.time()
+            #     agent_execution_start_ns = time.perf_counter_ns()
             #
             #     # Special case: image creation
             #     if agent_name == "interior_designer_create_image":
@@ -320,7 +321,7 @@ async def websocket_endpoint(websocket: WebSocket):
             #         agent_name, agent_selected, agent_context,
             #         project_client, tracer,
             #     )
-            #     log_timing("Agent Execution", agent_execution_start_time, f"Agent: {agent_name}")
+            #     log_timing("Agent Execution", agent_execution_start_ns, f"Agent: {agent_name}")
             #
             #     # --- Step 4: Process response and update session state ---
             #     parsed_response, session_discount_percentage, persistent_cart = process_response(
@@ -376,6 +377,7 @@ async def websocket_endpoint(websocket: WebSocket):
     finally:
         session_duration = time.time() - session_start_time
         logger.info(f"WebSocket Session Ended - Duration: {session_duration:.3f}s")
+        log_timing_counts()
 
 if __name__ == "__main__":
     import datetime
@@ -52,8 +52,8 @@ async def classify_intent(
     Returns:
         (agent_name, agent_selected) on success, or (None, None) if classification fails.
     """
-    handoff_start = time.time()
-    intent_result = handoff_service.classify_intent(
+    handoff_start_ns = time.perf_counter_ns()
+    intent_result = await handoff_service.classify_intent_async(
         user_message=user_message,
         session_id=session_id,
         chat_history=formatted_history,
@@ -67,7 +67,7 @@ async def classify_intent(
         f"confidence={intent_result['confidence']:.2f}, "
         f"reasoning={intent_result['reasoning']}"
     )
-    log_timing("Handoff Processing", handoff_start,
+    log_timing("Handoff Processing", handoff_start_ns,
                f"Selected: {agent_name} (confidence: {intent_result['confidence']:.2f})")
 
     if not agent_selected or not agent_name:
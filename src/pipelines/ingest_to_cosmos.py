@@ -1,13 +1,22 @@
+import asyncio
 import logging
 import json
 import os
+import random
+import sys
+import time
 from typing import Any
-import requests
 
-from azure.cosmos import CosmosClient, PartitionKey
-from azure.identity import DefaultAzureCredential
+import httpx
+from azure.cosmos import PartitionKey
+from azure.core.credentials import AccessToken
+from azure.cosmos.aio import CosmosClient
+from azure.identity.aio import DefaultAzureCredential
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.client_service import COSMOS_CLIENT_OPTIONS
+
 
 load_dotenv()
 
@@ -20,19 +29,40 @@ EMBEDDING_ENDPOINT = os.environ.get("embedding_endpoint")
 EMBEDDING_DEPLOYMENT = os.environ.get("embedding_deployment")
 EMBEDDING_API_VERSION = os.environ.get("embedding_api_version")
 
+# Upper bound on in-flight embedding + upsert requests
+MAX_CONCURRENCY = int(os.environ.get("INGEST_CONCURRENCY", "64"))
+# Catalog fields combined into the text that gets embedded
+VECTOR_FIELDS = ("ProductName", "ProductCategory", "ProductDescription")
+# Number of records scheduled per fan-out batch
+BATCH_SIZE = int(os.environ.get("INGEST_BATCH_SIZE", "10000"))
+# Report progress every N uploaded items rather than once per item
+LOG_EVERY = int(os.environ.get("INGEST_LOG_EVERY", "100"))
+# Retries for throttled (429) or unavailable (5xx) embedding requests
+EMBEDDING_MAX_RETRIES = int(os.environ.get("INGEST_EMBEDDING_RETRIES", "6"))
+# Longest wait between embedding retries when the service gives no Retry-After
+EMBEDDING_MAX_BACKOFF_S = 60.0
+# Refresh the shared embedding token when it has less than this many seconds left
+TOKEN_REFRESH_MARGIN_S = 300
+EMBEDDING_SCOPE = "https://cognitiveservices.azure.com/.default"
+
 credential = DefaultAzureCredential()
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.WARNING)
 
+# One embedding token shared by all upload tasks. With `az login`, each
+# get_token call on the CLI credential runs an `az` subprocess.
+_embedding_token: AccessToken | None = None
+_embedding_token_lock = asyncio.Lock()
+
 
-def get_cosmos_client(endpoint: str | None):
+async def get_cosmos_client(endpoint: str | None) -> CosmosClient:
     if not endpoint:
         raise ValueError("COSMOS_ENDPOINT must be provided in environment variables")
 
     logger.info("Authenticating to Cosmos DB using DefaultAzureCredential (managed identity)...")
-    client = CosmosClient(endpoint, credential=credential)
-    _ = list(client.list_databases())
+    client = CosmosClient(endpoint, credential=credential, **COSMOS_CLIENT_OPTIONS)
+    _ = [db async for db in client.list_databases()]
     logger.info("Authenticated to Cosmos DB with DefaultAzureCredential.")
     return client
 
@@ -60,21 +90,63 @@ def ensure_string_ids(item: dict[str, Any]) -> dict[str, Any]:
     return item
 
 
-def get_request_embedding(text: str) -> list[float] | None:
+def build_content_for_vector(item: dict[str, Any]) -> str:
+    """Join the non-empty VECTOR_FIELDS of an item into the text to embed."""
+    return " \n ".join([str(value) for value in map(item.get, VECTOR_FIELDS) if value])
+
+
+def prepare_items(raw_items: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Normalize ids for all records in one pass, dropping any without a ProductID."""
+    items = []
+    for raw in raw_items:
+        try:
+            items.append(ensure_string_ids(raw))
+        except (KeyError, TypeError) as ex:
+            logger.error("Failed to upload item: %s; error: %s", raw, ex)
+    return items
+
+
+async def get_embedding_token() -> str:
+    """Return the shared embedding bearer token, fetching a new one near expiry."""
+    global _embedding_token
+    async with _embedding_token_lock:
+        if _embedding_token is None or _embedding_token.expires_on - time.time() < TOKEN_REFRESH_MARGIN_S:
+            _embedding_token = await credential.get_token(EMBEDDING_SCOPE)
+        return _embedding_token.token
+
+
+def retry_delay(resp: httpx.Response, attempt: int) -> float:
+    """Seconds to wait before retrying resp: the service's Retry-After if given, else jittered backoff."""
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = resp.headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+    return min(EMBEDDING_MAX_BACKOFF_S, 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+async def get_request_embedding(http: httpx.AsyncClient, text: str) -> list[float] | None:
     """Call embedding endpoint and return the embedding vector or None on failure."""
     if not EMBEDDING_ENDPOINT or not EMBEDDING_DEPLOYMENT or not EMBEDDING_API_VERSION:
         logger.error("Embedding env vars not fully set; failing embedding generation.")
         return None
 
     url = EMBEDDING_ENDPOINT.rstrip("/") + f"/openai/deployments/{EMBEDDING_DEPLOYMENT}/embeddings?api-version={EMBEDDING_API_VERSION}"
-    token = credential.get_token("https://cognitiveservices.azure.com/.default")
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {token.token}",
-    }
     payload = {"input": text}
 
-    resp = requests.post(url, headers=headers, json=payload, timeout=30)
+    for attempt in range(EMBEDDING_MAX_RETRIES + 1):
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {await get_embedding_token()}",
+        }
+        resp = await http.post(url, headers=headers, json=payload, timeout=30)
+        if (resp.status_code != 429 and resp.status_code < 500) or attempt == EMBEDDING_MAX_RETRIES:
+            break
+        delay = retry_delay(resp, attempt)
+        logger.info("Embedding request returned %s; retrying in %.1fs", resp.status_code, delay)
+        await asyncio.sleep(delay)
     resp.raise_for_status()
     data = resp.json()
     # Expecting Azure OpenAI style response: {"data":[{"embedding": [...]}, ...]}
@@ -82,34 +154,15 @@ def get_request_embedding(text: str) -> list[float] | None:
     return embedding
 
 
-def main() -> None:
-    client = get_cosmos_client(COSMOS_ENDPOINT)
-
-    if not DATABASE_NAME:
-        raise ValueError("DATABASE_NAME must be provided in environment variables")
-
-    if not CONTAINER_NAME:
-        raise ValueError("CONTAINER_NAME must be provided in environment variables")
-
-    database = client.create_database_if_not_exists(id=DATABASE_NAME)
-    container = database.create_container_if_not_exists(
-        id=CONTAINER_NAME, partition_key=PartitionKey(path="/ProductID")
-    )
-
-    items = load_json_items(JSON_FILE)
-
-    for raw in items:
+async def upsert_one(container, http: httpx.AsyncClient, item: dict[str, Any], sem: asyncio.Semaphore) -> bool:
+    """Embed and upsert a single item, returning True on success."""
+    async with sem:
         try:
-            item = ensure_string_ids(dict(raw))
-
             # Build text to embed from ProductName, ProductCategory, ProductDescription
-            name = str(item.get("ProductName", ""))
-            category = str(item.get("ProductCategory", ""))
-            desc = str(item.get("ProductDescription", ""))
-            content_for_vector = " \n ".join([p for p in (name, category, desc) if p])
+            content_for_vector = build_content_for_vector(item)
 
             try:
-                embedding = get_request_embedding(content_for_vector)
+                embedding = await get_request_embedding(http, content_for_vector)
                 if embedding is not None:
                     item["request_vector"] = embedding
                 else:
@@ -117,13 +170,48 @@ def main() -> None:
             except Exception as e:
                 logger.warning("Failed to generate embedding for ProductID %s: %s", item.get("ProductID"), e)
 
-            container.upsert_item(body=item)
-            print(f"Uploaded: ProductID {item['ProductID']}")
+            await container.upsert_item(body=item)
+            return True
         except Exception as ex:
-            logger.error("Failed to upload item: %s; error: %s", raw, ex)
+            logger.error("Failed to upload item: %s; error: %s", item.get("ProductID"), ex)
+            return False
+
+
+async def main() -> None:
+    if not DATABASE_NAME:
+        raise ValueError("DATABASE_NAME must be provided in environment variables")
+
+    if not CONTAINER_NAME:
+        raise ValueError("CONTAINER_NAME must be provided in environment variables")
+
+    items = prepare_items(load_json_items(JSON_FILE))
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    uploaded = 0
+    without_vector = 0
+
+    async def upload(item: dict[str, Any]) -> None:
+        nonlocal uploaded, without_vector
+        if await upsert_one(container, http, item, sem):
+            uploaded += 1
+            if "request_vector" not in item:
+                without_vector += 1
+            if uploaded % LOG_EVERY == 0:
+                print(f"Uploaded {uploaded}/{len(items)} items...")
+
+    async with credential, await get_cosmos_client(COSMOS_ENDPOINT) as client, httpx.AsyncClient() as http:
+        database = await client.create_database_if_not_exists(id=DATABASE_NAME)
+        container = await database.create_container_if_not_exists(
+            id=CONTAINER_NAME, partition_key=PartitionKey(path="/ProductID")
+        )
+
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = items[start:start + BATCH_SIZE]
+            await asyncio.gather(*(upload(item) for item in batch))
 
-    print("All data uploaded to Cosmos DB.")
+    print(f"All data uploaded to Cosmos DB ({uploaded}/{len(items)} items).")
+    if without_vector:
+        print(f"{without_vector} uploaded items have no request_vector; re-run the ingest to embed them.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main())
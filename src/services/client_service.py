@@ -0,0 +1,101 @@
+"""
+Client service: process-wide shared SDK clients.
+
+Why share clients? Every CosmosClient and OpenAI client owns its own HTTP
+connection pool. Creating one per call (or per conversation turn) repeats
+DNS, TCP and TLS setup on every request, which dominates latency for the
+small, frequent calls this app makes. This module creates each client once
+per process, with retry and pool settings tuned for that workload, and
+hands out the same instance afterwards.
+
+Usage:
+    from services.client_service import get_cosmos_client, get_project_openai_client
+
+    container = get_cosmos_client(endpoint).get_database_client(db).get_container_client(name)
+    openai_client = get_project_openai_client(project_client)
+"""
+
+import os
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from azure.core.pipeline.transport import RequestsTransport
+from azure.cosmos import CosmosClient
+from azure.identity import DefaultAzureCredential, get_bearer_token_provider
+from openai import AzureOpenAI
+
+# HTTP connections kept open per host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "64"))
+
+# Shared Cosmos DB client options (also used by the async client in pipelines/ingest_to_cosmos.py)
+COSMOS_CLIENT_OPTIONS: Dict[str, Any] = {
+    "retry_total": 5,
+    "retry_backoff_factor": 0.5,
+    "retry_backoff_max": 30,
+    "connection_timeout": 30,
+    "logging_enable": False,
+}
+
+# Retries for transient OpenAI errors (429/5xx) before surfacing the failure
+OPENAI_MAX_RETRIES = 3
+
+# Cache: client key -> client instance
+_client_cache: Dict[str, Any] = {}
+
+
+def get_credential() -> DefaultAzureCredential:
+    """Return the shared DefaultAzureCredential (it caches tokens internally)."""
+    if "credential" not in _client_cache:
+        _client_cache["credential"] = DefaultAzureCredential()
+    return _client_cache["credential"]
+
+
+def _pooled_transport() -> RequestsTransport:
+    """Build a requests transport with a connection pool sized for concurrent callers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    return RequestsTransport(session=session, session_owner=False)
+
+
+def get_cosmos_client(endpoint: str) -> CosmosClient:
+    """Return the shared Cosmos DB client for endpoint, creating it on first use."""
+    if not endpoint:
+        raise ValueError("COSMOS_ENDPOINT must be provided in environment variables")
+
+    cache_key = f"cosmos_{endpoint}"
+    if cache_key not in _client_cache:
+        _client_cache[cache_key] = CosmosClient(
+            endpoint,
+            credential=get_credential(),
+            transport=_pooled_transport(),
+            **COSMOS_CLIENT_OPTIONS,
+        )
+    return _client_cache[cache_key]
+
+
+def get_azure_openai_client() -> AzureOpenAI:
+    """Return the shared AzureOpenAI client for the gpt_endpoint deployment."""
+    if "azure_openai" not in _client_cache:
+        token_provider = get_bearer_token_provider(get_credential(), "https://cognitiveservices.azure.com/.default")
+        _client_cache["azure_openai"] = AzureOpenAI(
+            azure_endpoint=os.getenv("gpt_endpoint"),
+            azure_ad_token_provider=token_provider,
+            api_version=os.getenv("gpt_api_version"),
+            max_retries=OPENAI_MAX_RETRIES,
+        )
+    return _client_cache["azure_openai"]
+
+
+def get_project_openai_client(project_client):
+    """Return the shared OpenAI client for a Foundry AIProjectClient.
+
+    AIProjectClient.get_openai_client() builds a new client (and connection
+    pool) on every call, so cache one per project client.
+    """
+    cache_key = f"project_openai_{id(project_client)}"
+    if cache_key not in _client_cache:
+        # Keep the project client alongside so its id() cannot be reused while cached
+        _client_cache[cache_key] = (project_client, project_client.get_openai_client())
+    return _client_cache[cache_key][1]
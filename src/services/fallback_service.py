@@ -1,52 +1,39 @@
 import time
 from utils.log_utils import log_timing
 
-def call_fallback(llm_client, fallback_prompt: str, gpt_deployment = "gpt-5.4-mini"):
-    """Call the fallback model and return its reply."""
-    start_time = time.time()
-    
-    chat_prompt = [    
+def _system_prompt(text: str) -> list:
+    """Build a chat prompt consisting of a single system message."""
+    return [
         {
-            "role": "system",      
-            "content": 
-            [           
-                {               
-                    "type": "text",               
-                    "text": fallback_prompt           
-                }       
-            ]   
+            "role": "system",
+            "content": [
+                {
+                    "type": "text",
+                    "text": text
+                }
+            ]
         }]
 
-    messages = chat_prompt
-    completion = llm_client.chat.completions.create(
+async def call_fallback(llm_client, fallback_prompt: str, gpt_deployment = "gpt-5.4-mini"):
+    """Call the fallback model and return its reply. llm_client must be an async OpenAI client."""
+    start_ns = time.perf_counter_ns()
+
+    completion = await llm_client.chat.completions.create(
         model=gpt_deployment,
-        messages=messages,
+        messages=_system_prompt(fallback_prompt),
         temperature=0.7,
         stream=False)
     result = completion.choices[0].message.content
-    log_timing("Fallback Call", start_time, f"Model: {gpt_deployment}")
+    log_timing("Fallback Call", start_ns, f"Model: {gpt_deployment}")
     return result
 
-def cora_fallback(llm_client, fallback_prompt: str, gpt_deployment = "Phi-4"):
-    """Call the fallback model for cora and return its reply."""
-    start_time = time.time()
-    
-    chat_prompt = [    
-        {
-            "role": "system",      
-            "content": 
-            [           
-                {               
-                    "type": "text",               
-                    "text": fallback_prompt           
-                }       
-            ]   
-        }]
+async def cora_fallback(llm_client, fallback_prompt: str, gpt_deployment = "Phi-4"):
+    """Call the fallback model for cora and return its reply. llm_client must be an async OpenAI client."""
+    start_ns = time.perf_counter_ns()
 
-    messages = chat_prompt
-    completion = llm_client.chat.completions.create(
+    completion = await llm_client.chat.completions.create(
         model=gpt_deployment,
-        messages=messages,
+        messages=_system_prompt(fallback_prompt),
         temperature=0.7,
         top_p=0.95,
         frequency_penalty=0,
@@ -54,5 +41,5 @@ def cora_fallback(llm_client, fallback_prompt: str, gpt_deployment = "Phi-4"):
         stop=None,
         stream=False)
     result = completion.choices[0].message.content
-    log_timing("Cora Fallback Call", start_time, f"Model: {gpt_deployment}")
-    return result
\ No newline at end of file
+    log_timing("Cora Fallback Call", start_ns, f"Model: {gpt_deployment}")
+    return result
@@ -7,14 +7,23 @@ from handoff_agent.py, providing:
 - Lazy classification for efficiency
 - Domain-based agent routing
 - Context transfer on handoff
+- Exact + semantic caching of classification results
+- Keyword fast path that skips the LLM for unambiguous intents
+- Async classification that keeps the event loop free
 """
 
+import asyncio
 import logging
 import os
 import random
-import json
-from typing import Any, Dict, Optional, Tuple
+import re
+import threading
+import time
+import orjson
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
 
+import numpy as np
 from openai import AzureOpenAI
 from pydantic import BaseModel, Field
 
@@ -40,6 +49,19 @@ class IntentClassification(BaseModel):
     )
 
 
+class IntentResult(TypedDict):
+    """
+    Plain-dict shape of a classification on the hot path.
+    
+    IntentClassification is kept for the agent's JSON schema; responses are
+    decoded straight into this shape and checked by HandoffService._validate_intent.
+    """
+    domain: str
+    is_domain_change: bool
+    confidence: float
+    reasoning: str
+
+
 # Domain definitions mapping to existing agents
 AGENT_DOMAINS = {
     "cora": {
@@ -65,6 +87,147 @@ AGENT_DOMAINS = {
 }
 
 
+class _SessionDomainCache:
+    """
+    Session -> domain mapping bounded by size (LRU) and idle time (TTL).
+    
+    Supports the dict operations HandoffService uses (get, [], in, pop) and counts
+    how many sessions were evicted for exceeding either bound.
+    """
+    
+    def __init__(self, maxsize: int, ttl_s: float):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.evictions = 0
+        self._data: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        # classify_intent runs in worker threads, so every access goes through this lock
+        self._lock = threading.Lock()
+    
+    def get(self, session_id: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return default
+            domain, expires_at = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                del self._data[session_id]
+                self.evictions += 1
+                return default
+            # Sliding expiry: an active session stays cached
+            self._data[session_id] = (domain, now + self.ttl_s)
+            self._data.move_to_end(session_id)
+            return domain
+    
+    def __setitem__(self, session_id: str, domain: str) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._data[session_id] = (domain, now + self.ttl_s)
+            self._data.move_to_end(session_id)
+            # Oldest entries are at the front: drop expired ones, then enforce maxsize
+            while self._data:
+                oldest_id, (_, expires_at) = next(iter(self._data.items()))
+                if expires_at > now and len(self._data) <= self.maxsize:
+                    break
+                del self._data[oldest_id]
+                self.evictions += 1
+    
+    def __contains__(self, session_id: str) -> bool:
+        # Goes through get(), so a membership check counts as activity and
+        # extends the session's expiry; use pop() to remove without refreshing
+        return self.get(session_id) is not None
+    
+    def pop(self, session_id: str) -> Optional[str]:
+        """Remove a session and return its domain, or None if absent or expired."""
+        with self._lock:
+            entry = self._data.pop(session_id, None)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self.evictions += 1
+                return None
+            return entry[0]
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class _VectorIndex:
+    """
+    Stacked unit embeddings for one current_domain, kept in sync with the intent cache.
+
+    Rows live in a preallocated matrix that doubles when full, so adding an entry
+    copies one vector (amortized) and removing one moves the last row into its slot.
+    """
+
+    def __init__(self, dim: int, capacity: int = 16):
+        self.keys: List[Tuple[str, str]] = []
+        self._rows: Dict[Tuple[str, str], int] = {}
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+
+    def add(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self._matrix):
+                grown = np.empty((2 * len(self._matrix), self._matrix.shape[1]), dtype=np.float32)
+                grown[:row] = self._matrix
+                self._matrix = grown
+            self.keys.append(key)
+            self._rows[key] = row
+        self._matrix[row] = vector
+
+    def remove(self, key: Tuple[str, str]) -> None:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last_key = self.keys.pop()
+        if last_key != key:
+            self._matrix[row] = self._matrix[len(self.keys)]
+            self.keys[row] = last_key
+            self._rows[last_key] = row
+
+    def best_match(self, query_vector: np.ndarray) -> Tuple[Optional[Tuple[str, str]], float]:
+        """Return the key with the highest cosine similarity to query_vector and that similarity."""
+        if not self.keys:
+            return None, 0.0
+        similarities = self._matrix[:len(self.keys)] @ query_vector
+        best = int(np.argmax(similarities))
+        return self.keys[best], float(similarities[best])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+# Deterministic cart phrases taken from the handoff agent prompt, fused into one
+# alternation so a message is scanned once. Each group is named after its domain.
+# A match routes directly to that domain without an LLM round trip; only explicit
+# phrases are listed so that everything else keeps the prompt's contextual rules.
+_FAST_RULES_RE = re.compile(
+    r"\b(?P<cart_manager>add (?:it |this |that )?to (?:my |the )?cart"
+    r"|remove (?:it |this |that )?from (?:my |the )?cart"
+    r"|view (?:my |the )?cart|my cart|checkout)\b",
+    re.IGNORECASE
+)
+
+
+# Leading fields of the IntentClassification JSON, in schema order. Once the
+# trailing comma after "confidence" has streamed, everything needed for routing
+# is known and the remaining "reasoning" text can be skipped.
+_CLASSIFICATION_HEAD_RE = re.compile(
+    r'"domain"\s*:\s*"(?P<domain>[a-z_]+)"\s*,\s*'
+    r'"is_domain_change"\s*:\s*(?P<is_domain_change>true|false)\s*,\s*'
+    r'"confidence"\s*:\s*(?P<confidence>[0-9.eE+-]+)\s*,'
+)
+
+
+# Per-turn input sent to the handoff agent. The static rules and domain table live
+# in the agent instructions, so every request shares the same cacheable prefix and
+# only this short tail varies. Keep it free of extra whitespace so identical turns
+# produce identical tokens.
+CLASSIFICATION_INPUT_TEMPLATE = "Current domain: {current_domain}\nUser message: {user_message}"
+
+
 class HandoffService:
     """
     Handoff service using intent classification for domain routing.
@@ -78,7 +241,12 @@ class HandoffService:
         azure_openai_client: AzureOpenAI,
         deployment_name: str,
         default_domain: str = "cora",
-        lazy_classification: bool = True
+        lazy_classification: bool = True,
+        embedding_deployment: Optional[str] = None,
+        cache_size: int = 1024,
+        similarity_threshold: float = 0.92,
+        max_sessions: int = 100_000,
+        session_ttl_s: float = 3600
     ):
         """
         Initialize handoff service.
@@ -88,14 +256,29 @@ class HandoffService:
             deployment_name: Model deployment name for classification
             default_domain: Default domain when no current domain exists
             lazy_classification: Enable lazy classification (check response for handoff markers)
+            embedding_deployment: Embedding deployment for the semantic cache (disabled if None)
+            cache_size: Maximum number of cached classifications (LRU eviction)
+            similarity_threshold: Minimum cosine similarity for a semantic cache hit
+            max_sessions: Maximum number of sessions whose domain is tracked (LRU eviction)
+            session_ttl_s: Seconds of inactivity after which a session's domain is forgotten
         """
         self.client = azure_openai_client
         self.deployment = deployment_name
         self.default_domain = default_domain
         self.lazy_classification = lazy_classification
         
-        # Session state: domain per session
-        self._session_domains: Dict[str, str] = {}
+        # Session state: domain per session, bounded so abandoned sessions do not accumulate
+        self._session_domains = _SessionDomainCache(max_sessions, session_ttl_s)
+        
+        # Classification cache: (current_domain, user_message) -> (unit embedding or None, intent)
+        self.embedding_deployment = embedding_deployment
+        self.cache_size = cache_size
+        self.similarity_threshold = similarity_threshold
+        self._intent_cache: "OrderedDict[Tuple[str, str], Tuple[Optional[np.ndarray], IntentResult]]" = OrderedDict()
+        # Stacked embeddings per current_domain, updated on every insert and eviction
+        self._vec_index: Dict[str, _VectorIndex] = {}
+        # Guards _intent_cache and _vec_index; classify_intent_async runs classifications in threads
+        self._cache_lock = threading.Lock()
         
         logger.info(
             f"[HANDOFF_SERVICE] Initialized with default_domain={default_domain}, "
@@ -136,13 +319,24 @@ class HandoffService:
                 "agent_name": AGENT_DOMAINS[self.default_domain]["name"]
             }
         
-        # Build classification prompt
-        prompt = f"""
-            Current domain: {current_domain}
-            User message: {user_message}
-        """
+        # Route unambiguous keyword matches without calling the LLM
+        intent = self._match_fast_rules(user_message, current_domain)
+        if intent is not None:
+            return self._apply_intent(intent, session_id, current_domain)
         
         try:
+            # Serve repeated or near-duplicate messages from the cache
+            intent, query_vector = self._cache_lookup(current_domain, user_message)
+            if intent is not None:
+                logger.info(f"[HANDOFF_SERVICE] Classification cache hit for session {session_id}")
+                return self._apply_intent(intent, session_id, current_domain)
+
+            # Build classification prompt
+            prompt = CLASSIFICATION_INPUT_TEMPLATE.format(
+                current_domain=current_domain,
+                user_message=user_message
+            )
+
             print("Sending classification request to LLM...")
             conversation = self.client.conversations.create(
                 items = [
@@ -156,37 +350,24 @@ class HandoffService:
 
             print(f"Created conversation for classification: {conversation.id}")
 
-            response = self.client.responses.create(
+            stream = self.client.responses.create(
                 conversation=conversation.id,
                 extra_body={"agent_reference": {"name": "handoff-service", "type": "agent_reference"}},
-                input=""
+                input="",
+                stream=True
             )
-
-            print("Received classification response.")
             
             # Extract structured result
-            intent = json.loads(response.output_text)
-            
-            result = {
-                "domain": intent["domain"],
-                "is_domain_change": intent["is_domain_change"],
-                "confidence": intent["confidence"],
-                "reasoning": intent["reasoning"],
-                "agent_id": intent["domain"],
-                "agent_name": AGENT_DOMAINS.get(intent["domain"], {}).get("name", "Unknown Agent")
-            }
-            print("Updating session domain if changed...")
-            
-            # Update session domain if changed
-            if intent["is_domain_change"]:
-                self._session_domains[session_id] = intent["domain"]
-                logger.info(f"[HANDOFF_SERVICE] Domain change for session {session_id}: {current_domain} -> {intent['domain']}")
+            intent = self._validate_intent(self._read_classification_stream(stream))
+
+            print("Received classification response.")
+            self._cache_store(current_domain, user_message, query_vector, intent)
             
-            logger.info(f"[HANDOFF_SERVICE] Intent classification: {result}")
-            return result
+            return self._apply_intent(intent, session_id, current_domain)
             
         except Exception as exc:
-            logger.error(f"[HANDOFF_SERVICE] Intent classification failed: {exc}", exc_info=True)
+            logger.error(f"[HANDOFF_SERVICE] Intent classification failed: {exc}")
+            logger.debug("[HANDOFF_SERVICE] Intent classification traceback", exc_info=True)
             
             # Fallback: stay with current domain or use random
             fallback_domain = current_domain or self.default_domain
@@ -202,6 +383,186 @@ class HandoffService:
                 "agent_name": AGENT_DOMAINS.get(fallback_domain, {}).get("name", "Unknown Agent")
             }
     
+    async def classify_intent_async(
+        self,
+        user_message: str,
+        session_id: str,
+        chat_history: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Classify user intent without blocking the event loop.
+        
+        The handoff agent call is synchronous, so it runs in a worker thread and
+        concurrent sessions classify in parallel. Same arguments and return value
+        as classify_intent.
+        """
+        return await asyncio.to_thread(self.classify_intent, user_message, session_id, chat_history)
+    
+    @staticmethod
+    def _read_classification_stream(stream) -> IntentResult:
+        """
+        Read a streamed IntentClassification response, stopping as soon as the
+        routing fields are complete.
+        
+        Falls back to parsing the full output if the leading fields never match
+        (e.g. the model emitted them in a different order).
+        """
+        text = ""
+        try:
+            for event in stream:
+                if event.type != "response.output_text.delta":
+                    continue
+                text += event.delta
+                match = _CLASSIFICATION_HEAD_RE.search(text)
+                if match:
+                    return {
+                        "domain": match.group("domain"),
+                        "is_domain_change": match.group("is_domain_change") == "true",
+                        "confidence": float(match.group("confidence")),
+                        "reasoning": "Classified from streamed response (reasoning not awaited)"
+                    }
+        finally:
+            stream.close()
+        return orjson.loads(text)
+    
+    @staticmethod
+    def _validate_intent(intent: Any) -> IntentResult:
+        """
+        Check a decoded classification against IntentResult before it is cached or applied.
+        
+        Raises ValueError if a field is missing or mistyped, the domain is unknown,
+        or confidence is outside [0, 1].
+        """
+        if not isinstance(intent, dict):
+            raise ValueError(f"Classification is not a JSON object: {intent!r}")
+        for key, expected in (("domain", str), ("is_domain_change", bool), ("reasoning", str)):
+            if not isinstance(intent.get(key), expected):
+                raise ValueError(f"Classification field '{key}' missing or not {expected.__name__}: {intent!r}")
+        confidence = intent.get("confidence")
+        if isinstance(confidence, bool) or not isinstance(confidence, (int, float)) or not 0.0 <= confidence <= 1.0:
+            raise ValueError(f"Confidence missing or out of range: {confidence!r}")
+        if intent["domain"] not in AGENT_DOMAINS:
+            raise ValueError(f"Unknown domain: {intent['domain']}")
+        return {
+            "domain": intent["domain"],
+            "is_domain_change": intent["is_domain_change"],
+            "confidence": float(confidence),
+            "reasoning": intent["reasoning"]
+        }
+    
+    def _apply_intent(self, intent: IntentResult, session_id: str, current_domain: str) -> Dict[str, Any]:
+        """Build the routing result for an intent and update the session domain."""
+        result = {
+            "domain": intent["domain"],
+            "is_domain_change": intent["is_domain_change"],
+            "confidence": intent["confidence"],
+            "reasoning": intent["reasoning"],
+            "agent_id": intent["domain"],
+            "agent_name": AGENT_DOMAINS.get(intent["domain"], {}).get("name", "Unknown Agent")
+        }
+        print("Updating session domain if changed...")
+        
+        # Update session domain if changed
+        if intent["is_domain_change"]:
+            self._session_domains[session_id] = intent["domain"]
+            logger.info(f"[HANDOFF_SERVICE] Domain change for session {session_id}: {current_domain} -> {intent['domain']}")
+        
+        logger.info(f"[HANDOFF_SERVICE] Intent classification: {result}")
+        return result
+    
+    @staticmethod
+    def _match_fast_rules(user_message: str, current_domain: str) -> Optional[IntentResult]:
+        """Return an intent for the first keyword rule match in the message, if any."""
+        match = _FAST_RULES_RE.search(user_message)
+        if match is None:
+            return None
+        domain = match.lastgroup
+        return {
+            "domain": domain,
+            "is_domain_change": domain != current_domain,
+            "confidence": 0.95,
+            "reasoning": f"Matched keyword '{match.group(0)}'"
+        }
+    
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        """Return the unit-normalized embedding for text, or None if unavailable."""
+        if not self.embedding_deployment:
+            return None
+        try:
+            response = self.client.embeddings.create(model=self.embedding_deployment, input=text)
+        except Exception as exc:
+            logger.warning(f"[HANDOFF_SERVICE] Embedding for classification cache failed: {exc}")
+            return None
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+    
+    def _cache_lookup(
+        self,
+        current_domain: str,
+        user_message: str
+    ) -> Tuple[Optional[IntentResult], Optional[np.ndarray]]:
+        """
+        Look up a cached intent, first by exact message, then by embedding similarity.
+        
+        Returns:
+            (intent or None, query embedding or None); the embedding is returned on a miss
+            so the caller can store it alongside the fresh classification.
+        """
+        key = (current_domain, user_message)
+        with self._cache_lock:
+            cached = self._intent_cache.get(key)
+            if cached is not None:
+                self._intent_cache.move_to_end(key)
+                return cached[1], None
+        
+        # Embed outside the lock so other sessions are not held up by the network call
+        query_vector = self._embed(user_message)
+        if query_vector is None:
+            return None, None
+        
+        with self._cache_lock:
+            index = self._vec_index.get(current_domain)
+            if index is None:
+                return None, query_vector
+
+            best_key, similarity = index.best_match(query_vector)
+            if best_key is not None and similarity >= self.similarity_threshold:
+                self._intent_cache.move_to_end(best_key)
+                return self._intent_cache[best_key][1], query_vector
+        return None, query_vector
+    
+    def _cache_store(
+        self,
+        current_domain: str,
+        user_message: str,
+        query_vector: Optional[np.ndarray],
+        intent: IntentResult
+    ) -> None:
+        """Insert a classification into the cache, evicting the least recently used entry."""
+        key = (current_domain, user_message)
+        with self._cache_lock:
+            self._intent_cache[key] = (query_vector, intent)
+            self._intent_cache.move_to_end(key)
+            index = self._vec_index.get(current_domain)
+            if query_vector is not None:
+                if index is None:
+                    index = self._vec_index[current_domain] = _VectorIndex(len(query_vector))
+                index.add(key, query_vector)
+            elif index is not None:
+                index.remove(key)
+
+            if len(self._intent_cache) > self.cache_size:
+                evicted_key, _ = self._intent_cache.popitem(last=False)
+                evicted_index = self._vec_index.get(evicted_key[0])
+                if evicted_index is not None:
+                    evicted_index.remove(evicted_key)
+    
+    @property
+    def session_evictions(self) -> int:
+        """Number of sessions dropped from domain tracking for size or inactivity."""
+        return self._session_domains.evictions
+    
     def get_current_domain(self, session_id: str) -> Optional[str]:
         """Get current domain for a session."""
         return self._session_domains.get(session_id)
@@ -217,6 +578,5 @@ class HandoffService:
     
     def reset_session(self, session_id: str) -> None:
         """Reset session domain."""
-        if session_id in self._session_domains:
-            del self._session_domains[session_id]
+        if self._session_domains.pop(session_id) is not None:
             logger.info(f"[HANDOFF_SERVICE] Reset session {session_id}")
@@ -0,0 +1,294 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+from services import handoff_service
+from services.handoff_service import HandoffService, _SessionDomainCache
+
+
+def _unit(values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _intent(domain):
+    return {"domain": domain, "is_domain_change": False, "confidence": 0.9, "reasoning": "test"}
+
+
+def _delta(text):
+    return SimpleNamespace(type="response.output_text.delta", delta=text)
+
+
+class _FakeStream:
+    def __init__(self, events):
+        self.events = events
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for event in self.events:
+            self.consumed += 1
+            yield event
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeClock:
+    """Replaces handoff_service.time so cache expiry can be driven by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def __enter__(self):
+        self._time = handoff_service.time
+        handoff_service.time = self
+        return self
+
+    def __exit__(self, *exc):
+        handoff_service.time = self._time
+
+
+class _FakeClient:
+    """Stands in for the project OpenAI client: every message is classified as inventory_agent."""
+
+    def __init__(self):
+        self.conversations = SimpleNamespace(create=self._create_conversation)
+        self.responses = SimpleNamespace(create=self._create_response)
+        self.embeddings = SimpleNamespace(create=self._create_embedding)
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _create_conversation(self, items):
+        return SimpleNamespace(id="conversation")
+
+    def _create_response(self, **kwargs):
+        with self._calls_lock:
+            self.calls += 1
+        time.sleep(0.001)
+        return _FakeStream([_delta('{"domain": "inventory_agent", "is_domain_change": true, "confidence": 0.8, '),
+                            _delta('"reasoning": "asks about stock"}')])
+
+    def _create_embedding(self, model, input):
+        rng = np.random.default_rng(abs(hash(input)) % 2**32)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=rng.normal(size=16).tolist())])
+
+
+def test_semantic_cache_index_tracks_inserts_and_evictions():
+    service = HandoffService(None, "handoff", cache_size=3)
+    service._cache_store("cora", "blue paint", _unit([1, 0, 0]), _intent("cora"))
+    service._cache_store("cora", "red paint", _unit([0, 1, 0]), _intent("interior_designer"))
+    service._cache_store("cora", "no embedding", None, _intent("cora"))
+    service._cache_store("cora", "green paint", _unit([0, 0, 1]), _intent("inventory_agent"))
+
+    # "blue paint" was least recently used and is gone from both the cache and the index
+    assert ("cora", "blue paint") not in service._intent_cache
+    assert sorted(service._vec_index["cora"].keys) == [("cora", "green paint"), ("cora", "red paint")]
+
+    service._embed = lambda text: _unit([0.05, 1, 0])
+    intent, _ = service._cache_lookup("cora", "crimson paint")
+    assert intent["domain"] == "interior_designer"
+
+    service._embed = lambda text: _unit([1, 0, 0])
+    intent, query_vector = service._cache_lookup("cora", "navy paint")
+    assert intent is None and query_vector is not None
+
+
+def test_cache_lookup_error_falls_back():
+    service = HandoffService(None, "handoff", embedding_deployment="embeddings")
+    service.set_domain("session", "interior_designer")
+    service._embed = lambda text: np.ones(4, dtype=np.float32)
+    service._cache_store("interior_designer", "seed", _unit([1, 0, 0]), _intent("cora"))
+
+    # Shape mismatch between the cached and query embeddings must not escape classify_intent
+    result = service.classify_intent("a new message", "session")
+    assert result["domain"] == "interior_designer"
+    assert result["confidence"] == 0.3
+
+
+def test_fast_rules_only_match_explicit_cart_phrases():
+    match = HandoffService._match_fast_rules
+    assert match("Please add this to my cart", "cora")["domain"] == "cart_manager"
+    assert match("Remove it from the cart", "cart_manager")["is_domain_change"] is False
+    assert match("What's in my cart?", "cora")["domain"] == "cart_manager"
+    assert match("I'm ready to checkout", "interior_designer")["domain"] == "cart_manager"
+
+    # Bare or ambiguous words are left to the handoff agent
+    assert match("Can you check out this photo of my bedroom?", "interior_designer") is None
+    assert match("Is there a discount on this paint?", "interior_designer") is None
+    assert match("Do you have it in stock?", "cora") is None
+    assert match("A cart for my garden tools", "cora") is None
+
+
+def test_concurrent_classifications():
+    client = _FakeClient()
+    service = HandoffService(client, "handoff", embedding_deployment="embeddings", cache_size=8)
+
+    async def run():
+        # Register every session first so the concurrent calls all reach the cache and LLM path
+        await asyncio.gather(*(service.classify_intent_async("hi", f"s{i % 32}") for i in range(32)))
+        return await asyncio.gather(
+            *(service.classify_intent_async(f"is item {i % 40} available?", f"s{i % 32}") for i in range(400))
+        )
+
+    results = asyncio.run(run())
+    # A race in the caches would surface as the 0.3-confidence fallback or an exception
+    assert all(r["domain"] == "inventory_agent" and r["confidence"] == 0.8 for r in results)
+    assert len(service._intent_cache) <= 8
+    assert client.calls > 0
+
+
+def test_eviction_during_semantic_lookup():
+    service = HandoffService(None, "handoff", embedding_deployment="embeddings", cache_size=1)
+    vector = _unit([1, 0, 0])
+    service._embed = lambda text: vector
+    service._cache_store("cora", "seed", vector, _intent("cora"))
+
+    # Hold the lookup between matching and reading the entry while another thread
+    # inserts, which evicts the matched entry unless the cache is locked
+    index = service._vec_index["cora"]
+    best_match = index.best_match
+    matched = threading.Event()
+
+    def slow_best_match(query_vector):
+        result = best_match(query_vector)
+        matched.set()
+        time.sleep(0.05)
+        return result
+
+    index.best_match = slow_best_match
+    writer = threading.Thread(
+        target=lambda: matched.wait() and service._cache_store("cora", "other", vector, _intent("cart_manager"))
+    )
+    writer.start()
+    intent, _ = service._cache_lookup("cora", "seed again")
+    writer.join()
+    assert intent["domain"] == "cora"
+    assert list(service._intent_cache) == [("cora", "other")]
+
+
+def test_session_cache_evicts_least_recently_used():
+    cache = _SessionDomainCache(maxsize=2, ttl_s=60)
+    cache["a"] = "cora"
+    cache["b"] = "cart_manager"
+    assert cache.get("a") == "cora"  # "a" is now most recently used
+    cache["c"] = "inventory_agent"
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "cora" and cache.get("c") == "inventory_agent"
+    assert len(cache) == 2 and cache.evictions == 1
+
+
+def test_session_cache_ttl_expiry():
+    with _FakeClock() as clock:
+        cache = _SessionDomainCache(maxsize=10, ttl_s=60)
+        cache["a"] = "cora"
+        cache["b"] = "cart_manager"
+
+        clock.now += 61
+        assert cache.get("a", "default") == "default"
+        assert cache.evictions == 1
+
+        # Expired entries at the front are also dropped when a new session is stored
+        cache["c"] = "cora"
+        assert len(cache) == 1 and cache.evictions == 2
+
+        clock.now += 61
+        assert cache.pop("c") is None
+        assert cache.evictions == 3
+
+
+def test_session_cache_contains_refreshes_expiry():
+    with _FakeClock() as clock:
+        cache = _SessionDomainCache(maxsize=10, ttl_s=60)
+        cache["a"] = "cora"
+        cache["b"] = "cora"
+
+        clock.now += 45
+        assert "a" in cache
+        clock.now += 45
+        # "a" was checked 45s ago; "b" has been idle for 90s
+        assert "a" in cache
+        assert "b" not in cache
+
+        # pop removes without needing a refresh first
+        assert cache.pop("a") == "cora"
+        assert "a" not in cache
+
+
+def test_read_classification_stream_stops_after_routing_fields():
+    stream = _FakeStream([
+        _delta('{"domain": "cart_'),
+        _delta('manager", "is_domain_change": true, "confidence": 0.87,'),
+        _delta(' "reasoning": "user wants'),
+        _delta(' to check out"}'),
+    ])
+    intent = HandoffService._read_classification_stream(stream)
+
+    assert intent["domain"] == "cart_manager"
+    assert intent["is_domain_change"] is True
+    assert intent["confidence"] == 0.87
+    assert stream.consumed == 2 and stream.closed
+
+
+def test_read_classification_stream_falls_back_to_full_parse():
+    # Fields out of schema order never match the head regex, so the whole response is parsed
+    stream = _FakeStream([
+        SimpleNamespace(type="response.created"),
+        _delta('{"confidence": 0.6, "domain": "cora",'),
+        _delta(' "is_domain_change": false, "reasoning": "general question"}'),
+        SimpleNamespace(type="response.completed"),
+    ])
+    intent = HandoffService._read_classification_stream(stream)
+
+    assert intent == {"domain": "cora", "is_domain_change": False, "confidence": 0.6, "reasoning": "general question"}
+    assert stream.consumed == 4 and stream.closed
+
+
+def test_malformed_classification_is_not_cached():
+    replies = [
+        '{"confidence": 0.5, "reasoning": "x", "is_domain_change": true}',
+        '{"domain": "sales_agent", "is_domain_change": true, "confidence": 0.9, "reasoning": "x"}',
+        '{"domain": "cora", "is_domain_change": "yes", "confidence": 0.9, "reasoning": "x"}',
+        '{"domain": "cora", "is_domain_change": true, "confidence": 1.5, "reasoning": "x"}',
+        '["cora"]',
+    ]
+    client = _FakeClient()
+    service = HandoffService(client, "handoff", embedding_deployment="embeddings")
+    service.set_domain("session", "interior_designer")
+
+    for reply in replies:
+        client.responses.create = lambda reply=reply, **kwargs: _FakeStream([_delta(reply)])
+        for _ in range(2):
+            result = service.classify_intent("What goes with a teal sofa?", "session")
+            assert result["domain"] == "interior_designer" and result["confidence"] == 0.3
+
+    assert len(service._intent_cache) == 0
+    assert service.get_current_domain("session") == "interior_designer"
+
+    # A well-formed reply is cached once the model recovers
+    client.responses.create = lambda **kwargs: _FakeStream([_delta(
+        '{"domain": "cora", "is_domain_change": true, "confidence": 1, "reasoning": "general question"}'
+    )])
+    result = service.classify_intent("What goes with a teal sofa?", "session")
+    assert result["domain"] == "cora" and result["confidence"] == 1.0
+    assert len(service._intent_cache) == 1
+
+
+if __name__ == "__main__":
+    test_semantic_cache_index_tracks_inserts_and_evictions()
+    test_cache_lookup_error_falls_back()
+    test_fast_rules_only_match_explicit_cart_phrases()
+    test_concurrent_classifications()
+    test_eviction_during_semantic_lookup()
+    test_session_cache_evicts_least_recently_used()
+    test_session_cache_ttl_expiry()
+    test_session_cache_contains_refreshes_expiry()
+    test_read_classification_stream_stops_after_routing_fields()
+    test_read_classification_stream_falls_back_to_full_parse()
+    test_malformed_classification_is_not_cached()
@@ -0,0 +1,86 @@
+from collections import deque
+
+from utils.history_utils import (
+    FormattedHistory, clean_conversation_history, format_chat_history,
+    parse_conversation_history, redact_bad_prompts_in_history
+)
+
+PRODUCT_REPLY = '[{"answer": "Try Frosted Blue.", "products": [{"id": "PROD0022", "name": "Frosted Blue"}]}]'
+
+
+def test_parse_marks_history_cleaned():
+    history = FormattedHistory(maxlen=5)
+    parse_conversation_history(f"user: blue paint?\nbot: {PRODUCT_REPLY}", history, "how much?")
+
+    assert history.cleaned
+    assert list(history) == [("user", "blue paint?"), ("bot", "Try Frosted Blue."), ("user", "how much?")]
+    # Already cleaned, so the second pass is skipped
+    assert clean_conversation_history(history) is history
+
+
+def test_parse_without_history_does_not_mark_cleaned():
+    history = FormattedHistory(maxlen=5)
+    history.append(("bot", PRODUCT_REPLY))
+    parse_conversation_history("", history, "hello")
+
+    assert not history.cleaned
+    cleaned = clean_conversation_history(history)
+    assert list(cleaned) == [("bot", "Try Frosted Blue."), ("user", "hello")]
+
+
+def test_bot_append_and_clear_reset_cleaned():
+    history = FormattedHistory(maxlen=5)
+    parse_conversation_history("user: hi\nbot: hello", history, "blue paint?")
+    assert history.cleaned
+
+    # A raw agent reply must be re-parsed so its product payload stays out of the prompt
+    history.append(("bot", PRODUCT_REPLY))
+    assert not history.cleaned
+    cleaned = clean_conversation_history(history)
+    assert cleaned is not history
+    assert cleaned.cleaned
+    assert list(cleaned)[-1] == ("bot", "Try Frosted Blue.")
+    assert "PROD0022" not in format_chat_history(cleaned)
+
+    cleaned.clear()
+    assert not cleaned.cleaned and len(cleaned) == 0
+
+    # A user append keeps the flag
+    parse_conversation_history("user: hi", history, "next")
+    history.append(("user", "another"))
+    assert history.cleaned
+
+
+def test_format_matches_plain_deque():
+    history = FormattedHistory(maxlen=3)
+    plain = deque(maxlen=3)
+    for entry in [("user", "a"), ("bot", "b"), ("user", "c"), ("bot", "d"), ("user", "e")]:
+        history.append(entry)
+        plain.append(entry)
+        assert format_chat_history(history) == "\n".join(
+            f"user: {msg}" if role == "user" else f"bot: {msg}" for role, msg in plain
+        )
+    assert history.format() == "user: c\nbot: d\nuser: e"
+
+    history.clear()
+    plain.clear()
+    assert format_chat_history(history) == format_chat_history(plain) == ""
+
+
+def test_redact_returns_input_when_nothing_matches():
+    history = FormattedHistory(maxlen=5)
+    history.append(("user", "hello"))
+    history.append(("bot", "hi"))
+    assert redact_bad_prompts_in_history(history, {"ignore previous instructions"}) is history
+
+    redacted = redact_bad_prompts_in_history(history, {"hello"})
+    assert redacted is not history
+    assert list(redacted) == [("user", "<redacted>"), ("bot", "hi")]
+
+
+if __name__ == "__main__":
+    test_parse_marks_history_cleaned()
+    test_parse_without_history_does_not_mark_cleaned()
+    test_bot_append_and_clear_reset_cleaned()
+    test_format_matches_plain_deque()
+    test_redact_returns_input_when_nothing_matches()
@@ -1,6 +1,5 @@
 from collections import deque
-from typing import Deque, Tuple
-import json
+from typing import Deque, Iterator, Optional, Tuple
 import orjson
 import time
 import logging
@@ -8,42 +7,104 @@ from utils.log_utils import log_timing
 
 logger = logging.getLogger(__name__)
 
+def _format_line(role: str, msg: str) -> str:
+    return f"user: {msg}" if role == "user" else f"bot: {msg}"
+
+class FormattedHistory:
+    """
+    Bounded chat history that keeps each entry's formatted prompt line alongside it.
+
+    Only append and clear are supported, so the lines cannot drift from the entries.
+    format() joins the lines once and reuses the text until the next change.
+
+    `cleaned` is set once bot messages have been reduced to their answers and is
+    reset by any bot append or clear, so clean_conversation_history can skip
+    histories that parse_conversation_history already cleaned.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None):
+        self._entries: Deque[Tuple[str, str]] = deque(maxlen=maxlen)
+        self._parts: Deque[str] = deque(maxlen=maxlen)
+        self._joined: Optional[str] = None
+        self.cleaned = False
+
+    @property
+    def maxlen(self) -> Optional[int]:
+        return self._entries.maxlen
+
+    def append(self, item: Tuple[str, str]) -> None:
+        self._entries.append(item)
+        self._parts.append(_format_line(*item))
+        self._joined = None
+        if item[0] != "user":
+            self.cleaned = False
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._parts.clear()
+        self._joined = None
+        self.cleaned = False
+
+    def format(self) -> str:
+        """Return the history as "user: ..."/"bot: ..." lines, reusing the cached text."""
+        if self._joined is None:
+            self._joined = "\n".join(self._parts)
+        return self._joined
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 def format_chat_history(chat_history: Deque[Tuple[str, str]]) -> str:
     """Format chat history for the handoff prompt."""
+    if isinstance(chat_history, FormattedHistory):
+        return chat_history.format()
     return "\n".join([
-        f"user: {msg}" if role == "user" else f"bot: {msg}"
+        _format_line(role, msg)
         for role, msg in chat_history
     ])
 
+def _clean_bot_message(message: str) -> str:
+    """Reduce a JSON agent response to its "answer" text; other messages are returned unchanged."""
+    # Only JSON objects/arrays can carry an answer, so skip the parse for plain text
+    if isinstance(message, str) and not message.lstrip().startswith(("[", "{")):
+        return message
+    try:
+        parsed = orjson.loads(message)
+    except (orjson.JSONDecodeError, TypeError, ValueError):
+        return message
+    # Handle list format (new agent response format)
+    if isinstance(parsed, list) and len(parsed) > 0:
+        first_item = parsed[0]
+        if isinstance(first_item, dict) and "answer" in first_item:
+            return first_item["answer"]
+    # Handle dict format (old format)
+    elif isinstance(parsed, dict) and "answer" in parsed:
+        return parsed["answer"]
+    return message
+
 def clean_conversation_history(history: Deque[Tuple[str, str]]) -> Deque[Tuple[str, str]]:
     """
     Clean conversation history by removing large product data and keeping only essential information.
+    Histories already cleaned by parse_conversation_history are returned as-is.
     """
-    cleaned_history = deque(maxlen=history.maxlen)
+    if getattr(history, "cleaned", False):
+        return history
+    cleaned_history = FormattedHistory(maxlen=history.maxlen)
     for role, message in history:
-        if role == "bot":
-            try:
-                parsed = json.loads(message)
-                if isinstance(parsed, list) and len(parsed) > 0:
-                    first_item = parsed[0]
-                    if isinstance(first_item, dict) and "answer" in first_item:
-                        cleaned_message = first_item["answer"]
-                    else:
-                        cleaned_message = message
-                elif isinstance(parsed, dict) and "answer" in parsed:
-                    cleaned_message = parsed["answer"]
-                else:
-                    cleaned_message = message
-            except (json.JSONDecodeError, TypeError):
-                cleaned_message = message
-        else:
-            cleaned_message = message
+        cleaned_message = _clean_bot_message(message) if role == "bot" else message
         cleaned_history.append((role, cleaned_message))
+    cleaned_history.cleaned = True
     return cleaned_history
 
 def redact_bad_prompts_in_history(history, bad_prompts):
-    # Returns a new deque with bad prompts replaced by <redacted>
-    redacted = deque(maxlen=history.maxlen)
+    # Returns a new deque with bad prompts replaced by <redacted>, or the
+    # history itself when there is nothing to redact
+    if not any(role == "user" and msg in bad_prompts for role, msg in history):
+        return history
+    redacted = FormattedHistory(maxlen=history.maxlen)
     for role, msg in history:
         if role == "user" and msg in bad_prompts:
             redacted.append((role, "<redacted>"))
@@ -52,7 +113,7 @@ def redact_bad_prompts_in_history(history, bad_prompts):
     return redacted
 
 def parse_conversation_history(conversation_history: str, chat_history: Deque[Tuple[str, str]], user_message: str):
-    history_start_time = time.time()
+    history_start_ns = time.perf_counter_ns()
     try:
         if conversation_history:
             # Clear existing chat history
@@ -66,25 +127,16 @@ def parse_conversation_history(conversation_history: str, chat_history: Deque[Tu
                 elif line.startswith('bot: '):
                     bot_msg = line[5:]   # Remove "bot: " prefix
                     # Clean bot messages to remove large JSON data
-                    try:
-                        parsed_bot = orjson.loads(bot_msg)  # Use orjson
-                        # Handle list format (new agent response format)
-                        if isinstance(parsed_bot, list) and len(parsed_bot) > 0:
-                            first_item = parsed_bot[0]
-                            if isinstance(first_item, dict) and "answer" in first_item:
-                                bot_msg = first_item["answer"]
-                        # Handle dict format (old format)
-                        elif isinstance(parsed_bot, dict) and "answer" in parsed_bot:
-                            bot_msg = parsed_bot["answer"]
-                    except (orjson.JSONDecodeError, TypeError):
-                        pass
-                    chat_history.append(("bot", bot_msg))
+                    chat_history.append(("bot", _clean_bot_message(bot_msg)))
             # Add the current user message to the history
             chat_history.append(("user", user_message))
+            if isinstance(chat_history, FormattedHistory):
+                chat_history.cleaned = True
         else:
             chat_history.append(("user", user_message))
-        log_timing("History Parsing", history_start_time, f"History entries: {len(chat_history)}")
+        log_timing("History Parsing", history_start_ns, f"History entries: {len(chat_history)}")
     except Exception as e:
-        logger.error("Error parsing conversation history", exc_info=True)
+        logger.error(f"Error parsing conversation history: {e}")
+        logger.debug("Conversation history parsing traceback", exc_info=True)
         chat_history.append(("user", user_message))
     return chat_history
\ No newline at end of file
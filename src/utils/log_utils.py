@@ -1,20 +1,52 @@
-import datetime
+import os
 import time
 import logging
+from collections import Counter
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# Operations faster than LOG_TIMING_MIN_S seconds are counted but not logged.
+# Read on first use rather than at import: chat_app.py imports this module
+# before load_dotenv() runs, and the threshold may be set in .env.
+_log_timing_min_s: Optional[float] = None
+
+def get_log_timing_min_s() -> float:
+    """Return the LOG_TIMING_MIN_S threshold (default 0.01s), reading it from the environment once."""
+    global _log_timing_min_s
+    if _log_timing_min_s is None:
+        _log_timing_min_s = float(os.getenv("LOG_TIMING_MIN_S", "0.01"))
+    return _log_timing_min_s
+
+# Number of log_timing calls per operation since the last log_timing_counts(),
+# including the ones below the threshold
+timing_counts: Counter = Counter()
+
 # Timing utility function with structured logging
-def log_timing(operation_name: str, start_time: float, additional_info: str = ""):
-    """Log timing information for operations using structured logging."""
-    elapsed_time = time.time() - start_time
-    timestamp = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
-    log_message = f"[TIMING] {timestamp} - {operation_name}: {elapsed_time:.3f}s"
+def log_timing(operation_name: str, start_ns: int, additional_info: str = ""):
+    """
+    Log timing information for operations using structured logging.
+    start_ns is a time.perf_counter_ns() reading; the wall-clock timestamp comes from the log formatter.
+    Operations shorter than LOG_TIMING_MIN_S are only counted in timing_counts.
+    """
+    elapsed_time = (time.perf_counter_ns() - start_ns) / 1e9
+    timing_counts[operation_name] += 1
+    if elapsed_time < get_log_timing_min_s() or not logger.isEnabledFor(logging.INFO):
+        return elapsed_time
+    log_message = f"[TIMING] {operation_name}: {elapsed_time:.3f}s"
     if additional_info:
         log_message += f" | {additional_info}"
     logger.info(log_message)
     return elapsed_time
 
+def log_timing_counts():
+    """Log how many times each operation was timed since the last call, then reset the counts."""
+    if not timing_counts:
+        return
+    counts = dict(timing_counts)
+    timing_counts.clear()
+    logger.info(f"[TIMING] Operation counts: {counts}")
+
 def log_cache_status(image_cache: dict, current_url: str = ""):
     """Log the current status of the image cache using structured logging."""
     cache_size = len(image_cache)
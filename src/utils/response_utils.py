@@ -1,12 +1,26 @@
-import json
 import re
 import orjson
 from utils.message_utils import fast_json_dumps
 
+# Compiled once at import; these run on every agent response
+_CODEBLOCK_RE = re.compile(r'```(?:json)?\s*([\[{].*[\]}])\s*```', re.DOTALL)
+_JSON_RE = re.compile(r'([\[{].*[\]}])', re.DOTALL)
+_BOT_REPLY_RE = re.compile(r"'value':\s*'([^']*)'")
+
 def extract_bot_reply(msg) -> str:
     """Extract the bot reply from the agent processor message."""
-    msg = str(msg)
-    match = re.search(r"'value':\s*'([^']*)'", msg)
+    if not isinstance(msg, str):
+        msg = str(msg)
+    start = msg.find("'value':")
+    if start < 0:
+        return msg
+    # Fast path: the usual "'value': '...'" layout can be sliced out directly
+    value_start = start + len("'value': '")
+    if msg.startswith(" '", start + len("'value':")):
+        end = msg.find("'", value_start)
+        if end >= 0:
+            return msg[value_start:end]
+    match = _BOT_REPLY_RE.search(msg, start)
     if match:
         result = match.group(1)
         return result
@@ -51,6 +65,67 @@ def extract_product_names_from_response(response_data) -> str:
     except Exception:
         return ""
 
+def _map_parsed_response(parsed_response) -> dict:
+    """Map a decoded agent response (list, dict or scalar) onto the response fields."""
+    if isinstance(parsed_response, list) and len(parsed_response) > 0:
+        first_item = parsed_response[0]
+        if isinstance(first_item, dict):
+            answer = first_item.get("answer", "")
+            products = first_item.get("products", "")
+            image_output = first_item.get("image_output", "")
+            discount_percentage = first_item.get("discount_percentage", "")
+            cart = first_item.get("cart", [])
+            if products and not isinstance(products, str):
+                products = fast_json_dumps(products)
+            return {
+                "answer": answer,
+                "agent": "",
+                "products": products,
+                "discount_percentage": str(discount_percentage) if discount_percentage else "",
+                "image_url": image_output,
+                "additional_data": "",
+                "cart": cart
+            }
+        else:
+            return {
+                "answer": str(parsed_response),
+                "agent": "",
+                "products": "",
+                "discount_percentage": "",
+                "image_url": "",
+                "additional_data": ""
+            }
+    elif isinstance(parsed_response, dict):
+        answer = parsed_response.get("answer", "")
+        if isinstance(answer, str) and answer.startswith('[') and answer.endswith(']'):
+            try:
+                nested_json = orjson.loads(answer)
+                if isinstance(nested_json, list) and len(nested_json) > 0:
+                    first_item = nested_json[0]
+                    if isinstance(first_item, dict) and "answer" in first_item:
+                        answer = first_item["answer"]
+            except (orjson.JSONDecodeError, TypeError, ValueError):
+                pass
+        return {
+            "answer": answer,
+            "agent": parsed_response.get("agent", ""),
+            "products": parsed_response.get("products", ""),
+            "discount_percentage": str(parsed_response.get("discount_percentage", "")) if parsed_response.get("discount_percentage") else "",
+            "image_url": parsed_response.get("image_url", ""),
+            "additional_data": parsed_response.get("additional_data", ""),
+            "cart": parsed_response.get("cart", [])
+        }
+    else:
+        return {
+            "answer": str(parsed_response),
+            "agent": "",
+            "products": "",
+            "discount_percentage": "",
+            "image_url": "",
+            "additional_data": "",
+            "cart": []
+        }
+
 def parse_agent_response(response: str) -> dict:
     """
     Parse agent response to check if it's JSON format.
@@ -59,76 +134,23 @@ def parse_agent_response(response: str) -> dict:
     If it's JSON, map the fields accordingly.
     If it's not JSON, return it as "answer" with other fields empty.
     """
+    # Fast path: agents usually return bare JSON, so try it before any regex scans
+    try:
+        return _map_parsed_response(orjson.loads(response))
+    except (orjson.JSONDecodeError, TypeError, ValueError):
+        pass
     # Try to extract JSON (object or array) from code block
-    codeblock_match = re.search(r'```(?:json)?\s*([\[{].*[\]}])\s*```', response, re.DOTALL)
+    codeblock_match = _CODEBLOCK_RE.search(response)
     if codeblock_match:
         response = codeblock_match.group(1).strip()
     else:
         # If not in code block, try to extract a JSON object or array from the string
-        json_match = re.search(r'([\[{].*[\]}])', response, re.DOTALL)
+        json_match = _JSON_RE.search(response)
         if json_match:
             response = json_match.group(1).strip()
     try:
-        parsed_response = json.loads(response)
-        if isinstance(parsed_response, list) and len(parsed_response) > 0:
-            first_item = parsed_response[0]
-            if isinstance(first_item, dict):
-                answer = first_item.get("answer", "")
-                products = first_item.get("products", "")
-                image_output = first_item.get("image_output", "")
-                discount_percentage = first_item.get("discount_percentage", "")
-                cart = first_item.get("cart", [])
-                if products and not isinstance(products, str):
-                    products = json.dumps(products)
-                return {
-                    "answer": answer,
-                    "agent": "",
-                    "products": products,
-                    "discount_percentage": str(discount_percentage) if discount_percentage else "",
-                    "image_url": image_output,
-                    "additional_data": "",
-                    "cart": cart
-                }
-            else:
-                return {
-                    "answer": str(parsed_response),
-                    "agent": "",
-                    "products": "",
-                    "discount_percentage": "",
-                    "image_url": "",
-                    "additional_data": ""
-                }
-        elif isinstance(parsed_response, dict):
-            answer = parsed_response.get("answer", "")
-            if isinstance(answer, str) and answer.startswith('[') and answer.endswith(']'):
-                try:
-                    nested_json = json.loads(answer)
-                    if isinstance(nested_json, list) and len(nested_json) > 0:
-                        first_item = nested_json[0]
-                        if isinstance(first_item, dict) and "answer" in first_item:
-                            answer = first_item["answer"]
-                except json.JSONDecodeError:
-                    pass
-            return {
-                "answer": answer,
-                "agent": parsed_response.get("agent", ""),
-                "products": parsed_response.get("products", ""),
-                "discount_percentage": str(parsed_response.get("discount_percentage", "")) if parsed_response.get("discount_percentage") else "",
-                "image_url": parsed_response.get("image_url", ""),
-                "additional_data": parsed_response.get("additional_data", ""),
-                "cart": parsed_response.get("cart", [])
-            }
-        else:
-            return {
-                "answer": str(parsed_response),
-                "agent": "",
-                "products": "",
-                "discount_percentage": "",
-                "image_url": "",
-                "additional_data": "",
-                "cart": []
-            }
-    except (json.JSONDecodeError, TypeError) as e:
+        return _map_parsed_response(orjson.loads(response))
+    except (orjson.JSONDecodeError, TypeError, ValueError) as e:
         return {
             "answer": str(response),
             "agent": "",